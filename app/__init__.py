@@ -1,26 +1,36 @@
 from flask import Flask
 from pathlib import Path
-from .services.analytics_service import AnalyticsService
 import os
-from dotenv import load_dotenv, dotenv_values 
-from flask_oauthlib.client import OAuth
-from .services.index import IndexManager
-from .services.search import SearchService
+import shutil
+from dotenv import load_dotenv
 
-load_dotenv() 
+# Deployments that provide their environment directly can skip reading .env
+if os.environ.get('SKIP_DOTENV') != '1':
+    load_dotenv()
+
+_TRUTHY = frozenset({'true', '1', 'yes', 'on'})
+
+def _env_flag(name: str) -> bool:
+    """Whether environment variable `name` is set to a truthy value."""
+    return os.environ.get(name, '').lower() in _TRUTHY
 
 def create_app(data_dir: str, index_file: str = None):
+    # Web-only dependencies (PostHog, OAuth, the route modules) are imported
+    # here rather than at package import, so `python -m app.cli` skips them
+    from .services.analytics_service import AnalyticsService
+    
     app = Flask(__name__)
     
     # Configure paths
     app.config['DATA_DIR'] = data_dir
-    app.config['AUDIO_DIR'] = Path(data_dir) / "audio"
+    # Kept as a str: it is only ever joined with os.path and passed to file APIs
+    app.config['AUDIO_DIR'] = os.fspath(Path(data_dir) / "audio")
     app.config['INDEX_FILE'] = index_file
         
     # Configure PostHog
     app.config['POSTHOG_API_KEY'] = os.environ.get('POSTHOG_API_KEY', '')
     app.config['POSTHOG_HOST'] = os.environ.get('POSTHOG_HOST', 'https://app.posthog.com')
-    app.config['DISABLE_ANALYTICS'] = os.environ.get('DISABLE_ANALYTICS', '').lower() in ('true', '1', 'yes')
+    app.config['DISABLE_ANALYTICS'] = _env_flag('DISABLE_ANALYTICS')
     
     # Initialize analytics service
     analytics_service = AnalyticsService(
@@ -29,17 +39,30 @@ def create_app(data_dir: str, index_file: str = None):
         disabled=app.config['DISABLE_ANALYTICS']
     )
     app.config['ANALYTICS_SERVICE'] = analytics_service
+    register_error_handlers(app, analytics_service)
     
     app.config['MIME_TYPES'] = {'opus': 'audio/opus'}
+
+    # Segment export shells out to ffmpeg; look it up once instead of per request
+    app.config['HAS_FFMPEG'] = shutil.which('ffmpeg') is not None
+
+    # URL prefix of an internal nginx location aliased to AUDIO_DIR; when set,
+    # audio bytes are sent by nginx via X-Accel-Redirect instead of by Flask
+    app.config['AUDIO_ACCEL_REDIRECT'] = os.environ.get('AUDIO_ACCEL_REDIRECT', '')
+    # Apache/lighttpd equivalent: send_file emits X-Sendfile with the absolute path
+    app.use_x_sendfile = _env_flag('USE_X_SENDFILE')
     
     # Set secret key for session
     app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key')
    
+    # Development login bypass for login_required, resolved once per app
+    in_dev = os.environ.get('FLASK_ENV') == 'development'
+    app.config['DEV_USER_EMAIL'] = os.environ.get('TS_USER_EMAIL') if in_dev else None
+   
     # Initialize Google OAuth
-    if os.environ.get('FLASK_ENV') != 'development':
-        from .routes.auth import init_oauth, bp as auth_bp
-        google = init_oauth(app)
-        app.extensions['google_oauth'] = google
+    if not in_dev:
+        from .routes.auth import init_oauth
+        init_oauth(app)
  
     # Register blueprints
     from .routes import main, search, auth, export, audio
@@ -61,6 +84,9 @@ def init_index_manager(app, file_records=None, index_file=None, force_reindex=Fa
         force_reindex: Whether to force rebuilding the index
         **db_kwargs: Database-specific connection parameters
     """
+    from .services.index import IndexManager
+    from .services.search import SearchService
+    
     # Set default database parameters if not provided
     if not db_kwargs:
         db_kwargs = {
@@ -72,24 +98,23 @@ def init_index_manager(app, file_records=None, index_file=None, force_reindex=Fa
         index_mgr = IndexManager(index_path=index_file, **db_kwargs)
     elif file_records:
         # Build index from files
-        index_mgr = IndexManager(file_records=file_records, **db_kwargs)
+        index_mgr = IndexManager(file_records=file_records, force_reindex=force_reindex, **db_kwargs)
     else:
         raise ValueError("Either file_records or index_file must be provided")
     
     app.config['SEARCH_SERVICE'] = SearchService(index_mgr)
     return index_mgr
 
-def register_error_handlers(app):
+def register_error_handlers(app, analytics_service=None):
+    """Register 404/500 handlers that report to the given analytics service."""
     @app.errorhandler(404)
     def handle_not_found(e):
-        analytics = app.config.get('ANALYTICS_SERVICE')
-        if analytics:
-            analytics.capture_error('not_found', str(e))
+        if analytics_service:
+            analytics_service.capture_error('not_found', str(e))
         return 'Page not found', 404
         
     @app.errorhandler(500)
     def handle_server_error(e):
-        analytics = app.config.get('ANALYTICS_SERVICE')
-        if analytics:
-            analytics.capture_error('server_error', str(e))
+        if analytics_service:
+            analytics_service.capture_error('server_error', str(e))
         return 'Internal server error', 500 
@@ -3,7 +3,6 @@ from pathlib import Path
 from .utils import get_transcripts
 from .services.index import IndexManager
 import logging
-import os
 import tempfile
 
 logging.basicConfig(level=logging.INFO)
@@ -28,22 +27,16 @@ def generate_index(data_dir: Path, output_file: Path):
     # Get transcript records
     file_records = get_transcripts(data_dir)
     
-    # Create a temporary database path for index generation
-    temp_db_path = tempfile.mktemp(suffix='.db')
-    
-    index_mgr = IndexManager(
-        file_records=file_records, 
-        path=temp_db_path
-    )
-    
-    # Save the index
-    index_mgr.save_index(output_file)
-    
-    # Clean up temporary database file
-    try:
-        os.remove(temp_db_path)
-    except OSError:
-        pass  # File might already be gone
+    # Build in a private temporary directory; it is removed together with the
+    # database and its -wal/-shm side files once the index has been saved
+    with tempfile.TemporaryDirectory(prefix='idxgen_', ignore_cleanup_errors=True) as td:
+        index_mgr = IndexManager(
+            file_records=file_records, 
+            path=str(Path(td) / 'index.db')
+        )
+        
+        # Save the index
+        index_mgr.save_index(output_file)
     
     logger.info(f"Index saved to {output_file}")
 
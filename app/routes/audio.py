@@ -1,112 +1,186 @@
 from flask import Blueprint, send_file, current_app, request, Response
+from werkzeug.http import is_resource_modified
+from werkzeug.wsgi import wrap_file
 from ..routes.auth import login_required
 from ..utils import resolve_audio_path
 import os
 import mimetypes
-import re
 import time
 import logging
-import uuid
-import glob
+import itertools
+from urllib.parse import quote
+from datetime import datetime, timezone
+from functools import lru_cache
 
 bp = Blueprint('audio', __name__)
 logger = logging.getLogger(__name__)
 
+# Short ids that tie together the log lines of one audio request: four hex
+# digits of the worker pid (uwsgi forks workers after import, so a per-process
+# seed would be shared) followed by four of a per-process counter
+_request_ids = itertools.count()
+
+# Audio files never change once published; let browsers cache them for a day
+AUDIO_MAX_AGE = 86400
+
+# Read size for streamed audio; large enough that a seek in <audio> costs a
+# handful of read/send round trips instead of one per 8 KB
+AUDIO_CHUNK_SIZE = 256 * 1024
+
+def _parse_range(header, size):
+    """Parse the first range of a Range header, e.g. 'bytes=12345-'.
+
+    Returns (first, last) byte offsets with last clamped to the file, or
+    None when the header is malformed and the whole file should be sent.
+    """
+    unit, _, spec = header.partition('=')
+    first, dash, last = spec.split(',', 1)[0].partition('-')
+    if unit.strip().lower() != 'bytes' or not dash:
+        return None
+    try:
+        if not first.strip():
+            # Suffix range: the last N bytes
+            suffix = int(last)
+            return (max(size - suffix, 0), size - 1) if suffix > 0 else None
+        byte1 = int(first)
+        byte2 = min(int(last), size - 1) if last.strip() else size - 1
+    except ValueError:
+        return None
+    return byte1, byte2
+
+@lru_cache(maxsize=32)
+def _content_type(ext):
+    """MIME type for a file extension; the audio tree only holds a few."""
+    return mimetypes.guess_type(f'file{ext}')[0] or 'application/octet-stream'
+
+def _set_cache_headers(resp, etag, mtime):
+    resp.set_etag(etag)
+    resp.last_modified = mtime
+    resp.cache_control.private = True
+    resp.cache_control.max_age = AUDIO_MAX_AGE
+
+def send_accel_redirect(path, prefix, request_id=None):
+    """Hand the file over to nginx, which serves it (ranges included) with sendfile."""
+    rel_path = os.path.relpath(path, current_app.config['AUDIO_DIR'])
+    resp = Response(status=200, mimetype=_content_type(os.path.splitext(path)[1]))
+    resp.headers['X-Accel-Redirect'] = f"{prefix.rstrip('/')}/{quote(rel_path.replace(os.sep, '/'))}"
+    resp.cache_control.private = True
+    resp.cache_control.max_age = AUDIO_MAX_AGE
+    if request_id:
+        logger.debug("[TIMING] [REQ:%s] Redirecting to nginx: %s", request_id, resp.headers['X-Accel-Redirect'])
+    return resp
+
 def send_range_file(path, request_id=None):
     start_time = time.time()
     if request_id:
-        logger.debug(f"[TIMING] [REQ:{request_id}] Starting to send file: {path}")
+        logger.debug("[TIMING] [REQ:%s] Starting to send file: %s", request_id, path)
     
     range_header = request.headers.get('Range', None)
-    if not os.path.exists(path):
+    # Open first and fstat the descriptor: no separate existence check, and
+    # the size and validators describe exactly the file that gets sent
+    try:
+        f = open(path, 'rb', buffering=0)
+    except FileNotFoundError:
         if request_id:
-            logger.error(f"[TIMING] [REQ:{request_id}] File not found: {path}")
+            logger.error("[TIMING] [REQ:%s] File not found: %s", request_id, path)
         return "File not found", 404
+    st = os.fstat(f.fileno())
+    size = st.st_size
+    content_type = _content_type(os.path.splitext(path)[1])
 
-    size = os.path.getsize(path)
-    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
-
-    def generate_chunks():
-        chunk_size = 8192  # 8KB chunks
-        with open(path, 'rb') as f:
-            if range_header:
-                # Example Range: bytes=12345-
-                byte1, byte2 = 0, None
-                m = re.search(r'bytes=(\d+)-(\d*)', range_header)
-                if m:
-                    byte1 = int(m.group(1))
-                    if m.group(2):
-                        byte2 = int(m.group(2))
-                if byte2 is None:
-                    byte2 = size - 1
-                length = byte2 - byte1 + 1
-                
-                if request_id:
-                    logger.debug(f"[TIMING] [REQ:{request_id}] Serving range request: bytes {byte1}-{byte2}/{size}")
-                
-                f.seek(byte1)
-                remaining = length
-                while remaining > 0:
-                    chunk = f.read(min(chunk_size, remaining))
-                    if not chunk:
-                        break
-                    remaining -= len(chunk)
-                    yield chunk
-            else:
-                if request_id:
-                    logger.debug(f"[TIMING] [REQ:{request_id}] Serving full file: {size} bytes")
-                
-                while True:
-                    chunk = f.read(chunk_size)
-                    if not chunk:
-                        break
-                    yield chunk
-
-    if range_header:
-        m = re.search(r'bytes=(\d+)-(\d*)', range_header)
-        if m:
-            byte1 = int(m.group(1))
-            byte2 = int(m.group(2)) if m.group(2) else size - 1
-            length = byte2 - byte1 + 1
-            
-            resp = Response(generate_chunks(), 206, mimetype=content_type)
-            resp.headers.add('Content-Range', f'bytes {byte1}-{byte2}/{size}')
-            resp.headers.add('Accept-Ranges', 'bytes')
-            resp.headers.add('Content-Length', str(length))
-            
-            if request_id:
-                duration_ms = (time.time() - start_time) * 1000
-                logger.debug(f"[TIMING] [REQ:{request_id}] Range file served in {duration_ms:.2f}ms")
-            
-            return resp
+    # Conditional GET: let the browser revalidate instead of re-downloading
+    etag = f"{st.st_mtime_ns:x}-{size:x}"
+    mtime = datetime.fromtimestamp(st.st_mtime, tz=timezone.utc)
+    if not is_resource_modified(request.environ, etag=etag, last_modified=mtime):
+        f.close()
+        resp = Response(status=304)
+        _set_cache_headers(resp, etag, mtime)
+        if request_id:
+            logger.debug("[TIMING] [REQ:%s] Not modified: %s", request_id, path)
+        return resp
+
+    # Parse the Range header once; an unsatisfiable start gets a 416
+    byte_range = _parse_range(range_header, size) if range_header else None
+    if byte_range and byte_range[0] > byte_range[1]:
+        f.close()
+        resp = Response(status=416)
+        resp.headers['Content-Range'] = f'bytes */{size}'
+        return resp
+
+    def generate_chunks(offset, length):
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(f.fileno(), offset, length, os.POSIX_FADV_SEQUENTIAL)
+        f.seek(offset)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(AUDIO_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
 
-    # No Range: return full file
-    resp = Response(generate_chunks(), 200, mimetype=content_type)
+    if byte_range:
+        byte1, byte2 = byte_range
+        length = byte2 - byte1 + 1
+        
+        if request_id:
+            logger.debug("[TIMING] [REQ:%s] Serving range request: bytes %d-%d/%d", request_id, byte1, byte2, size)
+        
+        resp = Response(generate_chunks(byte1, length), 206, mimetype=content_type)
+        resp.call_on_close(f.close)
+        resp.headers.add('Content-Range', f'bytes {byte1}-{byte2}/{size}')
+        resp.headers.add('Accept-Ranges', 'bytes')
+        resp.headers.add('Content-Length', str(length))
+        _set_cache_headers(resp, etag, mtime)
+        
+        if request_id:
+            logger.debug("[TIMING] [REQ:%s] Range file served in %.2fms",
+                         request_id, (time.time() - start_time) * 1000)
+        
+        return resp
+
+    # No Range: hand the open file to the server's wsgi.file_wrapper, which
+    # uwsgi/gunicorn send with sendfile(2) instead of copying it through Python
+    if request_id:
+        logger.debug("[TIMING] [REQ:%s] Serving full file: %d bytes", request_id, size)
+    resp = Response(wrap_file(request.environ, f, buffer_size=AUDIO_CHUNK_SIZE), 200, mimetype=content_type, direct_passthrough=True)
     resp.headers.add('Accept-Ranges', 'bytes')
     resp.headers.add('Content-Length', str(size))
+    _set_cache_headers(resp, etag, mtime)
     
     if request_id:
-        duration_ms = (time.time() - start_time) * 1000
-        logger.debug(f"[TIMING] [REQ:{request_id}] Full file served in {duration_ms:.2f}ms")
+        logger.debug("[TIMING] [REQ:%s] Full file served in %.2fms",
+                     request_id, (time.time() - start_time) * 1000)
     
     return resp
 
 @bp.route('/audio/<path:filename>')
 @login_required
 def serve_audio(filename):
-    request_id = str(uuid.uuid4())[:8]
+    request_id = f'{os.getpid() & 0xffff:04x}{next(_request_ids) & 0xffff:04x}'
     start_time = time.time()
     
-    logger.info(f"[TIMING] [REQ:{request_id}] Audio request received for: {filename}")
+    logger.info("[TIMING] [REQ:%s] Audio request received for: %s", request_id, filename)
     
     try:
         # Resolve the audio file path
         audio_path = resolve_audio_path(filename)
         if not audio_path:
-            logger.error(f"[TIMING] [REQ:{request_id}] Audio file not found for: {filename}")
+            logger.error("[TIMING] [REQ:%s] Audio file not found for: %s", request_id, filename)
             return f"Audio file not found for {filename}", 404
             
-        logger.debug(f"[TIMING] [REQ:{request_id}] Found audio file: {audio_path}")
+        logger.debug("[TIMING] [REQ:%s] Found audio file: %s", request_id, audio_path)
+
+        # Behind nginx let it stream the bytes; the dev server keeps serving them itself
+        accel_prefix = current_app.config.get('AUDIO_ACCEL_REDIRECT')
+        if accel_prefix and not current_app.debug:
+            return send_accel_redirect(audio_path, accel_prefix, request_id)
+        if current_app.use_x_sendfile and not current_app.debug:
+            resp = send_file(audio_path, conditional=True, max_age=AUDIO_MAX_AGE)
+            # send_file marks max_age responses public; this audio is login-gated
+            resp.cache_control.public = False
+            resp.cache_control.private = True
+            return resp
         return send_range_file(audio_path, request_id)
         
     except Exception as e:
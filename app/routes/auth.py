@@ -1,19 +1,20 @@
 from flask import Blueprint, render_template, redirect, url_for, session, request, current_app
-from flask_oauthlib.client import OAuth
 import os
 from functools import wraps
 
 bp = Blueprint('auth', __name__)
 
-oauth = OAuth()
+# Created by init_oauth; flask_oauthlib is only imported when Google login is used
+oauth = None
 
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        # Skip authentication in development mode if TS_USER_EMAIL is set
-        in_dev = os.environ.get('FLASK_ENV') == 'development'
-        if in_dev and os.environ.get('TS_USER_EMAIL'):
-            session["user_email"] = os.environ["TS_USER_EMAIL"]
+        # Skip authentication in development mode if TS_USER_EMAIL is set;
+        # only write the session once so responses don't re-sign the cookie
+        dev_user = current_app.config.get('DEV_USER_EMAIL')
+        if dev_user and "user_email" not in session:
+            session["user_email"] = dev_user
             
         if "user_email" not in session:
             # Store the requested URL in session
@@ -25,6 +26,10 @@ def login_required(f):
 def init_oauth(app):
     """Initialize OAuth with the Flask app"""
     global oauth
+    from flask_oauthlib.client import OAuth
+    
+    if oauth is None:
+        oauth = OAuth()
     
     # Configure Google OAuth
     google = oauth.remote_app(
@@ -44,6 +49,7 @@ def init_oauth(app):
     def get_google_oauth_token():
         return session.get("google_token")
     
+    app.extensions['google_oauth'] = google
     return google
 
 @bp.route("/login")
@@ -64,12 +70,12 @@ def authorize():
     if 'next_url' not in session:
         session['next_url'] = url_for('main.home')
         
-    google = current_app.extensions.get('google_oauth')
+    google = current_app.extensions['google_oauth']
     return google.authorize(callback=url_for("auth.authorized", _external=True))
 
 @bp.route("/login/authorized")
 def authorized():
-    google = current_app.extensions.get('google_oauth')
+    google = current_app.extensions['google_oauth']
     resp = google.authorized_response()
     
     if resp is None or resp.get("access_token") is None:
@@ -1,139 +1,253 @@
-from flask import Blueprint, request, send_file, current_app, jsonify
-import io
+from flask import Blueprint, request, current_app, abort, jsonify, Response, stream_with_context
+from werkzeug.datastructures import Headers
+from urllib.parse import quote
 import csv
+import codecs
 import subprocess
+import tempfile
+import unicodedata
+import zlib
 from ..services.search import SearchService
 from ..services.analytics_service import track_performance
-from ..utils import resolve_audio_path
+from ..utils import resolve_audio_path, request_flag
 import logging
 import time
 import os
-import glob
 
 logger = logging.getLogger(__name__)
 
 bp = Blueprint('export', __name__)
 
+# Rows are encoded and flushed to the client in batches of this size
+CSV_ROWS_PER_CHUNK = 500
+
+# Read size for ffmpeg's stdout when streaming an exported segment
+SEGMENT_CHUNK_SIZE = 64 * 1024
+
+# Threads per ffmpeg process; clips are short and several may encode at once
+SEGMENT_FFMPEG_THREADS = 2
+
+# Segment export formats (?format=) and their content types
+SEGMENT_FORMATS = {'mp3': 'audio/mpeg', 'opus': 'audio/ogg'}
+
+# zlib level for gzip-encoded CSV downloads; level 1 gets most of the ratio on text
+CSV_GZIP_LEVEL = 1
+
+class _Echo:
+    """File-like object whose write() hands the formatted CSV line back."""
+    def write(self, value):
+        return value
+
+# Every export uses Excel's CSV dialect and the same header row, so the header
+# is formatted once, with the UTF-8 BOM Excel needs in front of it
+_CSV_DIALECT = csv.excel
+_CSV_HEADER = codecs.BOM_UTF8 + csv.writer(_Echo(), dialect=_CSV_DIALECT).writerow(
+    ('Source', 'Text', 'Start Time', 'End Time')).encode('utf-8')
+
+def _attachment_headers(download_name):
+    """Content-Disposition for a download, with an RFC 5987 name for non-ASCII."""
+    headers = Headers()
+    try:
+        download_name.encode('ascii')
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', download_name).encode('ascii', 'ignore').decode('ascii')
+        headers.set('Content-Disposition', 'attachment',
+                    **{'filename': simple, 'filename*': f"UTF-8''{quote(download_name, safe='')}"})
+    else:
+        headers.set('Content-Disposition', 'attachment', filename=download_name)
+    return headers
+
+def _iter_results_csv(search_service, hits):
+    """Yield the CSV export as UTF-8 chunks, resolving segments as rows are written."""
+    writer = csv.writer(_Echo(), dialect=_CSV_DIALECT)
+    get_source = search_service._index_mgr.get().get_source_by_episode_idx
+    
+    writerow = writer.writerow
+    
+    yield _CSV_HEADER
+    rows = []
+    append = rows.append
+    for seg in search_service.segments_batch(hits):
+        append(writerow((
+            get_source(seg.episode_idx), seg.text, seg.start_sec, seg.end_sec
+        )))
+        if len(rows) >= CSV_ROWS_PER_CHUNK:
+            yield ''.join(rows).encode('utf-8', errors='replace')
+            rows.clear()
+    if rows:
+        yield ''.join(rows).encode('utf-8', errors='replace')
+
+def _gzip_chunks(chunks):
+    """Gzip a stream of byte chunks incrementally."""
+    compressor = zlib.compressobj(CSV_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    compress = compressor.compress
+    for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def _track_csv_export(chunks, query, start_time):
+    """Pass the CSV chunks through, reporting the export once it has been sent."""
+    try:
+        yield from chunks
+    finally:
+        # Covers the search and the whole streamed body, not just the hit lookup;
+        # runs inside the streamed request context, also on client disconnect
+        analytics = current_app.config.get('ANALYTICS_SERVICE')
+        if analytics:
+            analytics.capture_export(
+                export_type='csv',
+                query=query,
+                execution_time_ms=(time.perf_counter() - start_time) * 1000
+            )
+
 @bp.route('/export/results/<query>')
 @track_performance('export_csv', include_args=['query'])
 def export_results_csv(query):
-    start_time = time.time()
+    start_time = time.perf_counter()
+    regex = request_flag('regex')
     
-    # Get search service from main module
-    from ..routes import main
-    search_service = main.search_service
+    from ..routes.main import get_search_service
+    search_service = get_search_service()
     
-    # Always perform a new search to get all results
-    logger.info(f"Performing new search for CSV export: {query}")
+    # Hits usually come from the search that rendered the results page
+    logger.info("Exporting search results to CSV: %s", query)
     
-    # Get search hits
-    hits = search_service.search(query)
-    
-    # Enrich hits with segment info
-    all_results = []
-    for hit in hits:
-        seg = search_service.segment(hit)
-        all_results.append({
-            "episode_idx": hit.episode_idx,
-            "char_offset": hit.char_offset,
-            "source": search_service._index_mgr.get().get_source_by_episode_idx(hit.episode_idx),
-            "segment_idx": seg.seg_idx,
-            "start": seg.start_sec,
-            "end": seg.end_sec,
-            "text": seg.text
-        })
-    
-    # Create CSV in memory with UTF-8 BOM for Excel compatibility
-    output = io.StringIO()
-    output.write('\ufeff')  # UTF-8 BOM
-    writer = csv.writer(output, dialect='excel')
-    writer.writerow(['Source', 'Text', 'Start Time', 'End Time'])
-    
-    for r in all_results:
-        text = r['text'].encode('utf-8', errors='replace').decode('utf-8')
-        writer.writerow([r['source'], text, r['start'], r['end']])
-    
-    execution_time = (time.time() - start_time) * 1000
+    # Get search hits; segments are resolved while the CSV streams
+    try:
+        hits = search_service.search(query, regex=regex)
+    except ValueError as e:
+        abort(400, str(e))
     
-    # Track export analytics
-    analytics = current_app.config.get('ANALYTICS_SERVICE')
-    if analytics:
-        analytics.capture_export(
-            export_type='csv',
-            query=query,
-            execution_time_ms=execution_time
-        )
+    chunks = _iter_results_csv(search_service, hits)
+    headers = _attachment_headers(f'search_results_{query}.csv')
+    headers['Vary'] = 'Accept-Encoding'
+    if request.accept_encodings['gzip'] > 0:
+        chunks = _gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
     
-    output.seek(0)
-    return send_file(
-        io.BytesIO(output.getvalue().encode('utf-8')),
+    return Response(
+        stream_with_context(_track_csv_export(chunks, query, start_time)),
         mimetype='text/csv; charset=utf-8',
-        as_attachment=True,
-        download_name=f'search_results_{query}.csv'
+        headers=headers
     )
 
 @bp.route('/export/segment/<source>/<path:filename>')
 def export_segment(source, filename):
+    """Cut start..end (seconds) out of an episode and send it as a download.
+
+    Re-encoded to MP3 by default; ?format=opus copies the original opus
+    stream into an Ogg file instead, which needs no encoding at all.
+    """
     start_time = float(request.args.get('start', 0))
     end_time = float(request.args.get('end', 0))
     
     if end_time <= start_time:
         return "End time must be greater than start time", 400
     
+    fmt = request.args.get('format', 'mp3')
+    if fmt not in SEGMENT_FORMATS:
+        return "Unsupported format", 400
+    
+    if not current_app.config.get('HAS_FFMPEG'):
+        logger.error("Segment export requested but ffmpeg is not installed")
+        return "Audio export is not available", 503
+    
     try:
         # Resolve the audio file path
-        logger.info(f"Exporting segment: {source}/{filename}")
+        logger.info("Exporting segment: %s/%s", source, filename)
         audio_path = resolve_audio_path(f'{source}/{filename}.opus')
         if not audio_path:
             return "Source not found", 404
         
-        # Create a temporary buffer for the output
-        buffer = io.BytesIO()
-        
         # Build ffmpeg command for segment extraction
-        # -y: overwrite output file without asking
+        # -ss: start time, given before -i so ffmpeg seeks in the input
+        #      instead of decoding and discarding everything up to it
+        # -t: segment duration
         # -i: input file
-        # -ss: start time
-        # -to: end time
-        # -acodec: audio codec (libmp3lame)
-        # -ab: audio bitrate (192k)
-        # -f: output format (mp3)
-        # -: output to stdout
+        # -vn: drop any embedded cover art / video stream
+        # -f: output container, written to stdout ('-')
         cmd = [
-            'ffmpeg', '-y',
-            '-i', audio_path,
+            'ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error',
             '-ss', str(start_time),
-            '-to', str(end_time),
-            '-acodec', 'libmp3lame',
-            '-ab', '64k',
-            '-f', 'mp3',
-            '-'
+            '-t', str(end_time - start_time),
+            '-i', audio_path,
+            '-vn',
         ]
+        if fmt == 'opus':
+            # Copy the opus packets as-is: no decode/encode, cut on packet boundaries
+            cmd += ['-c', 'copy', '-f', 'ogg', '-']
+        else:
+            # -threads: cap encoder threads so concurrent exports don't oversubscribe
+            cmd += [
+                '-threads', str(SEGMENT_FFMPEG_THREADS),
+                '-acodec', 'libmp3lame',
+                '-ab', '64k',
+                '-f', 'mp3',
+                '-'
+            ]
         
-        # Run ffmpeg and capture output
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
+        # Run ffmpeg and stream its stdout to the client as it is encoded.
+        # stderr goes to a temp file rather than a pipe: nothing drains it
+        # while stdout is streaming, so a full pipe could stall ffmpeg.
+        stderr_file = tempfile.TemporaryFile()
+        try:
+            process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=stderr_file,
+                bufsize=0
+            )
+        except BaseException:
+            stderr_file.close()
+            raise
         
-        # Read the output
-        output, error = process.communicate()
+        def reap():
+            """Stop ffmpeg if still running, reap it, and return (returncode, stderr)."""
+            if process.poll() is None:
+                process.kill()
+            process.stdout.close()
+            returncode = process.wait()
+            stderr_file.seek(0)
+            error = stderr_file.read().decode(errors='replace')
+            stderr_file.close()
+            return returncode, error
         
-        if process.returncode != 0:
-            logger.error(f"FFmpeg error: {error.decode()}")
-            return "Error processing audio", 500
-            
-        # Write the output to the buffer
-        buffer.write(output)
-        buffer.seek(0)
+        def cleanup():
+            # Runs when the response is closed, including client disconnects
+            returncode, error = reap()
+            if returncode not in (0, -9):
+                logger.error("FFmpeg error (exit %s): %s", returncode, error)
         
-        return send_file(
-            buffer,
-            mimetype='audio/mpeg',
-            as_attachment=True,
-            download_name=f'{source}_{filename}_{start_time:.2f}-{end_time:.2f}.mp3'
-        )
+        try:
+            # Wait for the first chunk so a failed ffmpeg still gets a proper 500
+            first = process.stdout.read(SEGMENT_CHUNK_SIZE)
+            if not first:
+                returncode, error = reap()
+                logger.error("FFmpeg produced no output (exit %s): %s", returncode, error)
+                return "Error processing audio", 500
+            
+            def generate():
+                yield first
+                while True:
+                    chunk = process.stdout.read(SEGMENT_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+            
+            resp = Response(
+                generate(),
+                mimetype=SEGMENT_FORMATS[fmt],
+                headers=_attachment_headers(f'{source}_{filename}_{start_time:.2f}-{end_time:.2f}.{fmt}')
+            )
+            resp.call_on_close(cleanup)
+            return resp
+        except BaseException:
+            # Nothing will close a response for us; don't leave ffmpeg running
+            if not stderr_file.closed:
+                reap()
+            raise
         
     except Exception as e:
         logger.error(f"Error exporting segment: {str(e)}")
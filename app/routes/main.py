@@ -1,20 +1,74 @@
-from flask import Blueprint, render_template, request, jsonify, current_app
+from flask import Blueprint, render_template, request, current_app, abort, Response, stream_with_context
 from ..services.search import SearchService
 from ..services.analytics_service import track_performance
 from ..routes.auth import login_required
+from ..utils import json_response, request_flag
 import time
 import os
 import logging
-import uuid
+import threading
+from itertools import repeat
+from pathlib import Path
 from ..services.index import IndexManager
 
 logger = logging.getLogger(__name__)
 
 bp = Blueprint('main', __name__)
 
-# Global search service instance for persistence
-search_service = None
-file_records = None
+# Serialises the fallback index build so concurrent first searches build it once
+_search_service_lock = threading.Lock()
+
+def get_search_service() -> SearchService:
+    """Return the app's SearchService, building one on first use if startup didn't."""
+    search_service = current_app.config.get('SEARCH_SERVICE')
+    if search_service is not None:
+        return search_service
+    with _search_service_lock:
+        search_service = current_app.config.get('SEARCH_SERVICE')
+        if search_service is None:
+            # No index was initialised at startup; scan transcripts once and build one
+            from ..utils import get_transcripts
+            json_dir = Path(current_app.config['DATA_DIR']) / "json"
+            file_records = get_transcripts(json_dir)
+
+            # Get database type from environment
+            db_type = os.environ.get('DEFAULT_DB_TYPE', 'sqlite')
+
+            search_service = SearchService(IndexManager(file_records, db_type=db_type))
+            current_app.config['SEARCH_SERVICE'] = search_service
+    return search_service
+
+def _stream_template(template_name, **context):
+    """Render a template as a streamed response, flushing chunks as Jinja produces them."""
+    app = current_app._get_current_object()
+    app.update_template_context(context)
+    template = app.jinja_env.get_template(template_name)
+    return Response(stream_with_context(template.stream(context)), mimetype='text/html')
+
+# Fields of a /search result record; JSON clients may ask for a subset with ?fields=
+_RECORD_FIELDS = frozenset({'episode_idx', 'char_offset', 'recording_id', 'source',
+                            'segment_idx', 'start_sec', 'end_sec'})
+_SOURCE_FIELDS = frozenset({'recording_id', 'source'})
+_SEGMENT_FIELDS = frozenset({'segment_idx', 'start_sec', 'end_sec'})
+
+def _requested_fields():
+    """The ?fields= subset of result fields, or None for all of them."""
+    raw = request.args.get('fields')
+    if not raw:
+        return None
+    fields = frozenset(f.strip() for f in raw.split(',') if f.strip())
+    unknown = fields - _RECORD_FIELDS
+    if unknown:
+        abort(400, f"Unknown fields: {', '.join(sorted(unknown))}")
+    return fields
+
+def _wants_json() -> bool:
+    """JSON unless the client asks for HTML (browsers) or passes ?format=html."""
+    fmt = request.args.get('format')
+    if fmt in ('json', 'html'):
+        return fmt == 'json'
+    best = request.accept_mimetypes.best_match(['application/json', 'text/html'])
+    return best != 'text/html'
 
 @bp.route('/')
 @login_required
@@ -32,20 +86,18 @@ def search():
     query      = request.args.get('q', '').strip()
     per_page   = int(request.args.get('max_results_per_page', 100))
     page       = max(1, int(request.args.get('page', 1)))
-    start_time = time.time()
-
-    global search_service, file_records
-    if file_records is None:
-        from ..utils import get_transcripts
-        json_dir = current_app.config.get('DATA_DIR') / "json"
-        file_records = get_transcripts(json_dir)
-    if search_service is None:
-        # Get database type from environment
-        db_type = os.environ.get('DEFAULT_DB_TYPE', 'sqlite')
-        
-        search_service = SearchService(IndexManager(file_records, db_type=db_type))
-
-    hits = search_service.search(query)
+    regex      = request_flag('regex')
+    start_time = time.perf_counter()
+    wants_json = _wants_json()
+    # The results page renders every field; only JSON responses can be trimmed
+    fields = _requested_fields() if wants_json else None
+
+    search_service = get_search_service()
+
+    try:
+        hits = search_service.search(query, regex=regex)
+    except ValueError as e:
+        abort(400, str(e))
     total = len(hits)
 
     # simple slicing
@@ -53,19 +105,30 @@ def search():
     end_i   = start_i + per_page
     page_hits = hits[start_i:end_i]
 
-    # enrich hits with segment info (start time + index)
+    # enrich hits with segment info (start time + index), skipping lookups
+    # for fields the client didn't ask for
     records = []
-    for h in page_hits:
-        seg = search_service.segment(h)
-        records.append({
+    append = records.append
+    get_source = search_service._index_mgr.get().get_source_by_episode_idx
+    need_source = fields is None or not fields.isdisjoint(_SOURCE_FIELDS)
+    need_segment = fields is None or not fields.isdisjoint(_SEGMENT_FIELDS)
+    segments = search_service.segments_batch(page_hits) if need_segment else repeat(None)
+    for h, seg in zip(page_hits, segments):
+        record = {
             "episode_idx":  h.episode_idx,
             "char_offset":  h.char_offset,
-            "recording_id": search_service._index_mgr.get().get_source_by_episode_idx(h.episode_idx),
-            "source":       search_service._index_mgr.get().get_source_by_episode_idx(h.episode_idx),
-            "segment_idx":  seg.seg_idx,
-            "start_sec":    seg.start_sec,
-            "end_sec":      seg.end_sec,
-        })
+        }
+        if need_source:
+            source = get_source(h.episode_idx)
+            record["recording_id"] = source
+            record["source"] = source
+        if need_segment:
+            record["segment_idx"] = seg.seg_idx
+            record["start_sec"] = seg.start_sec
+            record["end_sec"] = seg.end_sec
+        if fields is not None:
+            record = {k: v for k, v in record.items() if k in fields}
+        append(record)
 
     pagination = {
         "page": page,
@@ -77,7 +140,7 @@ def search():
     }
 
     # Track search analytics
-    execution_time_ms = (time.time() - start_time) * 1000
+    execution_time_ms = (time.perf_counter() - start_time) * 1000
     analytics = current_app.config.get('ANALYTICS_SERVICE')
     if analytics:
         analytics.capture_search(
@@ -89,14 +152,15 @@ def search():
             total_results=total
         )
 
-    if request.headers.get('Accept') == 'application/json':
-        return jsonify({"results": records, "pagination": pagination})
+    if wants_json:
+        return json_response({"results": records, "pagination": pagination})
 
-    return render_template('results.html',
-                           query=query,
-                           results=records,
-                           pagination=pagination,
-                           max_results_per_page=per_page)
+    return _stream_template('results.html',
+                            query=query,
+                            regex='1' if regex else None,
+                            results=records,
+                            pagination=pagination,
+                            max_results_per_page=per_page)
 
 @bp.route('/privacy')
 def privacy_policy():
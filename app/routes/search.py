@@ -1,9 +1,11 @@
 # app/routes/search.py
 from __future__ import annotations
-from flask import Blueprint, request, jsonify, current_app, abort
+from flask import Blueprint, request, current_app, abort
 
 from app.services.search import SearchService, SearchHit
 from app.services.index import IndexManager
+from app.utils import json_response, request_json, request_flag
+from app.routes.auth import login_required
 
 bp = Blueprint("search", __name__, url_prefix="/search")
 
@@ -15,16 +17,29 @@ def search():
     q = request.args.get("q", "")
     if not q:
         abort(400, "missing ?q=")
-    regex = bool(request.args.get("regex"))
-    hits = search_svc.search(q, regex=regex)
-    return jsonify([hit.__dict__ for hit in hits])
+    regex = request_flag("regex")
+    # Regex scans are far costlier than plain ones, so only signed-in users get them
+    if regex:
+        return _regex_search(search_svc, q)
+    return _run_search(search_svc, q, regex=False)
+
+def _run_search(search_svc, q, regex):
+    try:
+        hits = search_svc.search(q, regex=regex)
+    except ValueError as e:
+        abort(400, str(e))
+    return json_response(hits)
+
+@login_required
+def _regex_search(search_svc, q):
+    return _run_search(search_svc, q, regex=True)
 
 @bp.route("/segment", methods=["POST"])
 def get_segment():
     search_svc = current_app.config["SEARCH_SERVICE"]
     
     try:
-        lookups = request.json["lookups"]
+        lookups = request_json()["lookups"]
         if not isinstance(lookups, list):
             abort(400, "lookups must be an array")
         
@@ -47,7 +62,7 @@ def get_segment():
                 # Skip invalid lookups but continue processing others
                 continue
         
-        return jsonify(results)
+        return json_response(results)
             
     except (KeyError, ValueError) as e:
         abort(400, str(e))
@@ -58,13 +73,12 @@ def get_segments_by_idx():
     index_mgr = search_svc._index_mgr.get()
     
     try:
-        lookups = request.json["lookups"]
+        lookups = request_json()["lookups"]
         if not isinstance(lookups, list):
             abort(400, "lookups must be an array")
         
         # Prepare batch lookup
         batch_lookups = []
-        valid_lookups = []
         
         for lookup in lookups:
             try:
@@ -72,26 +86,26 @@ def get_segments_by_idx():
                 idx = int(lookup["segment_idx"])
                 doc_id = epi
                 batch_lookups.append((doc_id, idx))
-                valid_lookups.append((epi, idx))
             except (KeyError, ValueError) as e:
                 # Skip invalid lookups but continue processing others
                 continue
         
-        # Perform batch lookup
+        # Perform batch lookup; rows come back de-duplicated and sorted, with
+        # out-of-range lookups dropped, so each row carries its own ids
         segments = index_mgr.get_segments_by_ids(batch_lookups)
         
         # Map results back to original format
         results = []
-        for (epi, idx), segment_data in zip(valid_lookups, segments):
+        for segment_data in segments:
             results.append({
-                "episode_idx": epi,
+                "episode_idx": segment_data["doc_id"],
                 "segment_index": segment_data["segment_id"],
                 "start_sec": segment_data["start_time"],
                 "end_sec": segment_data["end_time"],
                 "text": segment_data["text"]
             })
         
-        return jsonify(results)
+        return json_response(results)
             
     except (KeyError, ValueError) as e:
         abort(400, str(e))
\ No newline at end of file
@@ -31,7 +31,7 @@ class AnalyticsService:
                 user_id,
                 properties or {}
             )
-            logger.debug(f"Identified user: {user_id}")
+            logger.debug("Identified user: %s", user_id)
         except Exception as e:
             logger.error(f"Failed to identify user: {str(e)}")
     
@@ -54,7 +54,7 @@ class AnalyticsService:
                 event_name,
                 properties
             )
-            logger.debug(f"Captured event: {event_name}")
+            logger.debug("Captured event: %s", event_name)
         except Exception as e:
             logger.error(f"Failed to capture event: {str(e)}")
     
@@ -81,12 +81,15 @@ class AnalyticsService:
                 properties['user_email'] = session['user_email']
             
             self.capture_event('search_executed', properties)
-            logger.debug(f"Tracked search: {query}")
+            logger.debug("Tracked search: %s", query)
         except Exception as e:
             logger.error(f"Failed to track search: {str(e)}")
     
     def capture_export(self, export_type, query=None, source=None, format=None, execution_time_ms=None):
         """Capture export event with details"""
+        if self.disabled:
+            return
+            
         properties = {
             'export_type': export_type,
             'execution_time_ms': execution_time_ms,
@@ -108,6 +111,9 @@ class AnalyticsService:
     
     def capture_error(self, error_type, error_message, context=None):
         """Capture error events with context"""
+        if self.disabled:
+            return
+            
         properties = {
             'error_type': error_type,
             'error_message': error_message,
@@ -1,29 +1,163 @@
 from pathlib import Path
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
 import time
 import logging
 from dataclasses import dataclass, field
-from typing import List, Tuple, Optional
+from functools import lru_cache
+from typing import Iterable, Iterator, List, NamedTuple, Tuple, Optional
 from concurrent.futures import ThreadPoolExecutor
 import os
+import re
+import sqlite3
+import sys
+import regex
 from tqdm.auto import tqdm
 
 from ..utils import FileRecord
 from .db import DatabaseService
 
 
+# Separator placed between documents in the in-memory corpus; it never occurs
+# in transcript text, so no match can straddle two documents.
+_DOC_SEP = "\x1f"
+
+# Limits on user-supplied regex searches; the regex engine backtracks, so a
+# pathological pattern must not be able to hold a worker indefinitely
+REGEX_MAX_PATTERN_LENGTH = 200
+REGEX_TIMEOUT = 2.0  # seconds for the whole corpus scan
+
+
+def _fold(text: str) -> str:
+    """Case-fold text without changing its length, so char offsets stay valid."""
+    folded = text.casefold()
+    if len(folded) == len(text):
+        return folded
+    # Casefold the runs between the few characters that expand, in C, and
+    # fold only those characters one by one
+    parts = _expanding_chars_re().split(text)
+    parts[::2] = [part.casefold() for part in parts[::2]]
+    parts[1::2] = [_fold_char(c) for c in parts[1::2]]
+    return "".join(parts)
+
+
+@lru_cache(maxsize=1)
+def _expanding_chars_re() -> "re.Pattern":
+    """Pattern capturing each character whose casefold() is not one code point."""
+    # Stdlib re: a plain character class scans several times faster than in regex
+    chars = [c for c in map(chr, range(sys.maxunicode + 1)) if len(c.casefold()) != 1]
+    return re.compile("([" + "".join(map(re.escape, chars)) + "])")
+
+
+def _fold_char(c: str) -> str:
+    # A few characters (e.g. 'ß', 'İ') fold to two code points; fall back to
+    # lower() or leave them as-is so the folded text keeps the same length
+    folded = c.casefold()
+    if len(folded) == 1:
+        return folded
+    lowered = c.lower()
+    return lowered if len(lowered) == 1 else c
+
+
+class _SegmentTable(NamedTuple):
+    """Segments of one document as parallel arrays; position == segment_id."""
+    texts: list[str]
+    offsets: array
+    starts: array
+    ends: array
+    logprobs: array
+
+    @classmethod
+    def empty(cls) -> "_SegmentTable":
+        return cls([], array('q'), array('d'), array('d'), array('d'))
+
+    def row(self, segment_id: int) -> dict:
+        return {
+            "segment_id": segment_id,
+            "text": self.texts[segment_id],
+            "avg_logprob": self.logprobs[segment_id],
+            "char_offset": self.offsets[segment_id],
+            "start_time": self.starts[segment_id],
+            "end_time": self.ends[segment_id]
+        }
+
+
+@lru_cache(maxsize=256)
+def _compile_pattern(pattern: str) -> "regex.Pattern":
+    """Compile a user-supplied search pattern, reusing recent compilations."""
+    try:
+        return regex.compile(pattern, regex.IGNORECASE)
+    except regex.error as e:
+        raise ValueError(f"Invalid pattern: {e}") from e
+
+
 @dataclass(slots=True)
 class TranscriptIndex:
-    """Database-agnostic transcript index with useful query methods."""
+    """Database-agnostic transcript index with useful query methods.
+
+    Document texts, sources and segment tables are read from the database once
+    and kept in memory, so searches and segment lookups never touch the disk.
+    All document texts are case-folded and joined into a single corpus
+    separated by ``_DOC_SEP`` so a query is answered by one ``str.find`` scan.
+    """
     _db: DatabaseService
-        
-    def get_document_stats(self) -> tuple[int, int]:
-        """Get document count and total character count in a single query."""
+    _corpus: str = field(default="", init=False, repr=False)
+    _doc_ids: list[int] = field(default_factory=list, init=False, repr=False)
+    _doc_starts: list[int] = field(default_factory=list, init=False, repr=False)
+    _sources: dict[int, str] = field(default_factory=dict, init=False, repr=False)
+    _segments: dict[int, _SegmentTable] = field(default_factory=dict, init=False, repr=False)
+    _has_trigrams: bool = field(default=False, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._load_cache()
+
+    def _load_cache(self) -> None:
+        """Load documents and segments into memory."""
+        log = logging.getLogger("index")
+        t0 = time.perf_counter()
+
+        texts = []
+        start = 0
+        cursor = self._db.execute("SELECT doc_id, source, full_text FROM documents ORDER BY doc_id")
+        for doc_id, source, full_text in cursor:
+            full_text = full_text or ""
+            self._sources[doc_id] = source
+            self._doc_ids.append(doc_id)
+            self._doc_starts.append(start)
+            # Folded per document, so one with an expanding character doesn't
+            # send the whole corpus down _fold's slow path
+            texts.append(_fold(full_text))
+            start += len(full_text) + len(_DOC_SEP)
+            self._segments[doc_id] = _SegmentTable.empty()
+        self._corpus = _DOC_SEP.join(texts)
+
         cursor = self._db.execute("""
-            SELECT COUNT(*) as doc_count, SUM(LENGTH(full_text)) as total_chars 
-            FROM documents
+            SELECT doc_id, segment_id, segment_text, avg_logprob, char_offset, start_time, end_time
+            FROM segments
+            ORDER BY doc_id, segment_id
         """)
-        result = cursor.fetchone()
-        return (result[0], result[1])
+        for doc_id, _, text, avg_logprob, char_offset, start_time, end_time in cursor:
+            table = self._segments[doc_id]
+            table.texts.append(text)
+            table.logprobs.append(avg_logprob or 0.0)
+            table.offsets.append(char_offset)
+            table.starts.append(start_time)
+            table.ends.append(end_time)
+
+        cursor = self._db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'documents_trigram'"
+        )
+        self._has_trigrams = cursor.fetchone() is not None
+        if not self._has_trigrams:
+            log.info("Index has no trigram table; searches will scan the whole corpus")
+
+        log.info(f"Loaded {len(self._doc_ids)} documents into memory in {time.perf_counter() - t0:.2f}s")
+
+    def get_document_stats(self) -> tuple[int, int]:
+        """Get document count and total character count."""
+        doc_count = len(self._doc_ids)
+        return (doc_count, len(self._corpus) - max(doc_count - 1, 0) * len(_DOC_SEP))
                
     def get_segments_by_ids(self, lookups: list[tuple[int, int]]) -> list[dict]:
         """Get multiple segments by (doc_id, segment_id) pairs."""
@@ -31,110 +165,128 @@ class TranscriptIndex:
             return []
         
         logger = logging.getLogger(__name__)
-        logger.info(f"Fetching segments by IDs: {len(lookups)} lookups")
+        logger.debug("Fetching segments by IDs: %d lookups", len(lookups))
         
-        # Build the WHERE clause for multiple (doc_id, segment_id) pairs
-        placeholders = []
-        params = []
-        for doc_id, segment_id in lookups:
-            placeholders.append("(doc_id = ? AND segment_id = ?)")
-            params.extend([doc_id, segment_id])
+        result = []
+        for doc_id, segment_id in sorted(set(lookups)):
+            table = self._segments.get(doc_id)
+            if table is None or not 0 <= segment_id < len(table.texts):
+                continue
+            result.append({"doc_id": doc_id, **table.row(segment_id)})
         
-        query = f"""
-            SELECT doc_id, segment_id, segment_text, avg_logprob, char_offset, start_time, end_time
-            FROM segments 
-            WHERE {' OR '.join(placeholders)}
-            ORDER BY doc_id, segment_id
-        """
+        logger.debug("Fetched segments by IDs: %d lookups, %d results", len(lookups), len(result))
         
-        cursor = self._db.execute(query, params)
-        result = cursor.fetchall()
-        
-        logger.info(f"Fetched segments by IDs: {len(lookups)} lookups, {len(result)} results")
-        
-        return [
-            {
-                "doc_id": row[0],
-                "segment_id": row[1],
-                "text": row[2],
-                "avg_logprob": row[3],
-                "char_offset": row[4],
-                "start_time": row[5],
-                "end_time": row[6]
-            }
-            for row in result
-        ]
+        return result
     
     def get_segment_at_offset(self, doc_id: int, char_offset: int) -> dict:
         """Get the segment that contains the given character offset."""
-        logger = logging.getLogger(__name__)
-        logger.info(f"Fetching segment at offset: doc_id={doc_id}, char_offset={char_offset}")
-        
-        cursor = self._db.execute("""
-            SELECT segment_id, segment_text, avg_logprob, char_offset, start_time, end_time
-            FROM segments 
-            WHERE doc_id = ? AND char_offset <= ? 
-            ORDER BY char_offset DESC 
-            LIMIT 1
-        """, [doc_id, char_offset])
-        
-        result = cursor.fetchone()
-        if not result:
+        table = self._segments.get(doc_id)
+        pos = bisect_right(table.offsets, char_offset) - 1 if table is not None else -1
+        if pos < 0:
             raise IndexError(f"No segment found at offset {char_offset} for document {doc_id}")
         
-        logger.info(f"Fetched segment at offset: doc_id={doc_id}, char_offset={char_offset}, segment_id={result[0]}")
+        logger = logging.getLogger(__name__)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Fetched segment at offset: doc_id=%s, char_offset=%s, segment_id=%s",
+                         doc_id, char_offset, pos)
         
-        return {
-            "segment_id": result[0],
-            "text": result[1],
-            "avg_logprob": result[2],
-            "char_offset": result[3],
-            "start_time": result[4],
-            "end_time": result[5]
-        }
+        return table.row(pos)
         
     def get_source_by_episode_idx(self, episode_idx: int) -> str:
         """Get document source by episode index (0-based)."""
         doc_id = episode_idx
-        cursor = self._db.execute(
-            "SELECT source FROM documents WHERE doc_id = ?", 
-            [doc_id]
-        )
-        result = cursor.fetchone()
-        if not result:
-            raise IndexError(f"Document {doc_id} not found")
-        return result[0]
-
-    def search_hits(self, query: str) -> list[tuple[int, int]]:
-        """Search for query and return (episode_idx, char_offset) pairs for hits."""
-        return self._search_sqlite_simple(query)
+        try:
+            return self._sources[doc_id]
+        except KeyError:
+            raise IndexError(f"Document {doc_id} not found") from None
+
+    def search_hits(self, query: str, regex: bool = False) -> list[tuple[int, int]]:
+        """Search for query (case-insensitive) and return (episode_idx, char_offset) pairs for hits.
+
+        With ``regex=True`` the query is treated as a regular expression.
+        Raises ValueError if it does not compile, is too long, or takes longer
+        than ``REGEX_TIMEOUT`` to search.
+        """
+        if regex:
+            return self._search_regex(query)
+        return self._search_memory(_fold(query))
+
+    def _search_regex(self, pattern: str) -> list[tuple[int, int]]:
+        """Scan the in-memory corpus with a compiled regular expression."""
+        hits = []
+        if not pattern:
+            return hits
+
+        if len(pattern) > REGEX_MAX_PATTERN_LENGTH:
+            raise ValueError(f"Pattern is longer than {REGEX_MAX_PATTERN_LENGTH} characters")
+
+        compiled = _compile_pattern(pattern)
+        corpus = self._corpus
+        deadline = time.monotonic() + REGEX_TIMEOUT
+        try:
+            # Match each document's slice separately so no match spans two documents
+            for i, doc_id in enumerate(self._doc_ids):
+                start, end = self._doc_span(i)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError
+                for m in compiled.finditer(corpus, start, end, timeout=remaining):
+                    if m.end() > m.start():
+                        hits.append((doc_id, m.start() - start))
+        except TimeoutError:
+            raise ValueError("Pattern took too long to search; simplify it") from None
+
+        return hits
     
-    def _search_sqlite_simple(self, query: str) -> list[tuple[int, int]]:
-        """Search using SQLite UDF for pattern matching."""
+    def _search_memory(self, query: str) -> list[tuple[int, int]]:
+        """Scan the in-memory corpus for non-overlapping matches."""
 
         log = logging.getLogger("index")
-        log.info(f"Searching for query: {query}")
+        log.debug("Searching for query: %s", query)
 
-        cursor = self._db.execute("""
-            SELECT doc_id, match_offsets(full_text, ?) as offsets
-            FROM documents 
-            WHERE full_text LIKE ?
-        """, [query, f'%{query}%'])
-        
-        result = cursor.fetchall()
         hits = []
-        
-        for row in result:
-            doc_id = row[0]
-            offsets_str = row[1]
-            if offsets_str:
-                # Split the comma-separated offsets and convert to integers
-                offsets = [int(offset) for offset in offsets_str.split(',')]
-                # Add (doc_id, offset) pairs to hits
-                hits.extend([(doc_id, offset) for offset in offsets])
+        if not query or _DOC_SEP in query:
+            return hits
+
+        corpus = self._corpus
+        doc_ids = self._doc_ids
+        doc_starts = self._doc_starts
+        step = len(query)
+
+        if self._has_trigrams and len(query) >= 3:
+            # Only scan the documents that contain every trigram of the query
+            for doc_id in self._trigram_candidates(query):
+                start, end = self._doc_span(bisect_left(doc_ids, doc_id))
+                pos = corpus.find(query, start, end)
+                while pos != -1:
+                    hits.append((doc_id, pos - start))
+                    pos = corpus.find(query, pos + step, end)
+            return hits
+
+        pos = corpus.find(query)
+        while pos != -1:
+            i = bisect_right(doc_starts, pos) - 1
+            hits.append((doc_ids[i], pos - doc_starts[i]))
+            pos = corpus.find(query, pos + step)
         
         return hits
 
+    def _doc_span(self, i: int) -> tuple[int, int]:
+        """Return the [start, end) corpus range of the i-th cached document."""
+        start = self._doc_starts[i]
+        if i + 1 < len(self._doc_starts):
+            return start, self._doc_starts[i + 1] - len(_DOC_SEP)
+        return start, len(self._corpus)
+
+    def _trigram_candidates(self, query: str) -> list[int]:
+        """Return ids of documents whose folded text contains all trigrams of query."""
+        phrase = '"' + query.replace('"', '""') + '"'
+        cursor = self._db.execute(
+            "SELECT rowid FROM documents_trigram WHERE documents_trigram MATCH ? ORDER BY rowid",
+            [phrase]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
 
 def _setup_schema(db: DatabaseService):
     """Create the transcript database schema."""
@@ -153,6 +305,16 @@ def _setup_schema(db: DatabaseService):
         )
     """)
     
+    # Trigram index over the folded document text, used to find candidate
+    # documents for a query without scanning the whole corpus
+    db.execute("""
+        CREATE VIRTUAL TABLE documents_trigram USING fts5(
+            full_text,
+            content = '',
+            tokenize = 'trigram case_sensitive 1'
+        )
+    """)
+    
     # Create segments table
     db.execute("""
         CREATE TABLE segments (
@@ -191,8 +353,14 @@ def _setup_schema(db: DatabaseService):
 
 # ­­­­­­­­­­­­­­­­­­­­­­­­­­­­-------------------------------------------------- #
 class IndexManager:
-    """Global, read-only index using database-agnostic service."""
-    def __init__(self, file_records: Optional[List[FileRecord]] = None, index_path: Optional[Path] = None, **db_kwargs) -> None:
+    """Global, read-only index using database-agnostic service.
+
+    When built from file records, the database at ``db_kwargs['path']`` is
+    kept on disk and reused on the next start as long as it still matches the
+    transcripts; pass ``force_reindex=True`` to always rebuild it.
+    """
+    def __init__(self, file_records: Optional[List[FileRecord]] = None, index_path: Optional[Path] = None,
+                 force_reindex: bool = False, **db_kwargs) -> None:
         self._file_records = file_records
         self._index_path = Path(index_path) if index_path else None
         self._db_kwargs = db_kwargs
@@ -201,7 +369,10 @@ class IndexManager:
         if index_path and Path(index_path).exists():
             self._index = self._load_index()
         elif file_records:
-            self._index = self._build()
+            if not force_reindex and self._is_fresh():
+                self._index = TranscriptIndex(DatabaseService(**self._db_kwargs))
+            else:
+                self._index = self._build()
         else:
             raise ValueError("Either file_records or index_path must be provided")
 
@@ -217,6 +388,8 @@ class IndexManager:
         # For SQLite, we can copy the file directly
         import shutil
         if "path" in self._db_kwargs and self._db_kwargs["path"] != ":memory:":
+            # Fold the WAL back into the main file so the copy is complete
+            self._index._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
             shutil.copy2(self._db_kwargs["path"], path)
         else:
             raise NotImplementedError("Cannot save in-memory SQLite database")
@@ -246,6 +419,41 @@ class IndexManager:
 
         return TranscriptIndex(db)
 
+    def _is_fresh(self) -> bool:
+        """Check whether the on-disk database already indexes the current file records."""
+        log = logging.getLogger("index")
+        path = self._db_kwargs.get("path", "explore.sqlite")
+        if path == ":memory:" or not os.path.exists(path):
+            return False
+
+        newest = max(rec.json_path.stat().st_mtime for rec in self._file_records)
+        if os.path.getmtime(path) < newest:
+            log.info(f"Index {path} is older than the transcripts; rebuilding")
+            return False
+
+        try:
+            with DatabaseService(**self._db_kwargs) as db:
+                sources = [row[0] for row in db.execute("SELECT source FROM documents ORDER BY doc_id")]
+        except sqlite3.DatabaseError as e:
+            log.info(f"Index {path} is unreadable ({e}); rebuilding")
+            return False
+
+        if sources != [rec.id for rec in self._file_records]:
+            log.info(f"Index {path} does not match the transcript files; rebuilding")
+            return False
+
+        log.info(f"Reusing existing index: {path}")
+        return True
+
+    @staticmethod
+    def _remove_db_files(path: str) -> None:
+        """Delete a database file together with its WAL/shared-memory files."""
+        for p in (path, f"{path}-wal", f"{path}-shm"):
+            try:
+                os.remove(p)
+            except FileNotFoundError:
+                pass
+
     def _load_and_convert(self, rec_idx: int, rec: FileRecord) -> Tuple[int, str, dict, float, float]:
         """Load and convert a single record, with timing."""
         t0 = time.perf_counter()
@@ -267,6 +475,11 @@ class IndexManager:
         records = list(enumerate(self._file_records))
         total_files = len(records)
         
+        # Start from an empty database file so the schema can be created
+        path = self._db_kwargs.get("path", "explore.sqlite")
+        if path != ":memory:":
+            self._remove_db_files(path)
+        
         # Create database service
         db = DatabaseService(for_index_generation=True, **self._db_kwargs)
         
@@ -275,19 +488,29 @@ class IndexManager:
         _setup_schema(db)
         
         # Use CPU count for thread pool size, but cap at 16 to avoid too many threads
-        n_threads = min(1, os.cpu_count() or 4)
+        # and never start more workers than there are files
+        n_threads = max(1, min(16, os.cpu_count() or 4, total_files))
         log.info(f"Building index with {n_threads} threads for {total_files} files")
         
         with ThreadPoolExecutor(max_workers=n_threads) as executor:
-            # Submit all jobs
-            futures = [
-                executor.submit(self._load_and_convert, rec_idx, rec)
-                for rec_idx, rec in records
-            ]
+            # Keep only a bounded window of jobs in flight, so parsed transcripts
+            # don't pile up in memory faster than they are inserted
+            pending = deque()
+            remaining = iter(records)
+            
+            def submit_next() -> None:
+                for rec_idx, rec in remaining:
+                    pending.append(executor.submit(self._load_and_convert, rec_idx, rec))
+                    return
+            
+            for _ in range(n_threads * 2):
+                submit_next()
             
             # Process results and insert directly into database
             with tqdm(total=total_files, desc="Building index", unit="file") as pbar:
-                for future in futures:
+                while pending:
+                    future = pending.popleft()
+                    submit_next()
                     t_append = time.perf_counter()
                     rec_idx, rec_id, data, read_ms, conv_ms = future.result()
                     
@@ -301,6 +524,10 @@ class IndexManager:
                         "INSERT INTO documents (doc_id, source, episode, full_text) VALUES (?, ?, ?, ?)",
                         [doc_id, rec_id, rec_id, data["full"]]
                     )
+                    db.execute(
+                        "INSERT INTO documents_trigram (rowid, full_text) VALUES (?, ?)",
+                        [doc_id, _fold(data["full"])]
+                    )
                     
                     # Insert all segments for this document in one batch
                     # Prepare batch insert for segments
@@ -398,3 +625,25 @@ def segment_for_hit(index: TranscriptIndex, episode_idx: int,
         start_sec=segment_data["start_time"],
         end_sec=segment_data["end_time"]
     )
+
+
+def segments_for_hits(index: TranscriptIndex,
+                      hits: Iterable[tuple[int, int]]) -> Iterator[Segment]:
+    """Yield the segment containing each (episode_idx, char_offset) pair.
+
+    Same result as calling `segment_for_hit` per pair, but the segment table
+    is looked up once per run of hits in the same episode and each Segment
+    is built straight from the table's arrays.
+    """
+    segments = index._segments
+    doc_id = table = None
+    for episode_idx, char_offset in hits:
+        if episode_idx != doc_id:
+            doc_id = episode_idx
+            table = segments.get(doc_id)
+            if table is not None:
+                offsets, texts, starts, ends = table.offsets, table.texts, table.starts, table.ends
+        pos = bisect_right(offsets, char_offset) - 1 if table is not None else -1
+        if pos < 0:
+            raise IndexError(f"No segment found at offset {char_offset} for document {doc_id}")
+        yield Segment(episode_idx, pos, texts[pos], starts[pos], ends[pos])
@@ -1,10 +1,12 @@
 from __future__ import annotations
 import time
 import logging
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import List
+from typing import Iterable, Iterator, List
 
-from .index import IndexManager, TranscriptIndex, segment_for_hit, Segment
+from .index import IndexManager, TranscriptIndex, segment_for_hit, segments_for_hits, Segment
 
 logger = logging.getLogger(__name__)
 
@@ -15,31 +17,70 @@ class SearchHit:
 
 
 class SearchService:
-    """Stateless, one-pass search over the current TranscriptIndex."""
+    """One-pass search over the current TranscriptIndex.
+
+    The hit lists of the most recent queries are kept, so paging through
+    results or exporting them right after a search doesn't scan again.
+    Both the number of kept queries and their total hit count are bounded;
+    a query with more hits than the total budget is never kept.
+    """
+    RECENT_SEARCHES = 16
+    RECENT_MAX_HITS = 500_000
+
     def __init__(self, index_mgr: IndexManager) -> None:
         self._index_mgr = index_mgr
+        self._recent: OrderedDict[tuple[str, bool], List[SearchHit]] = OrderedDict()
+        self._recent_hits = 0
+        self._recent_lock = threading.Lock()
         # Log index statistics on initialization
         idx = self._index_mgr.get()
         doc_count, total_chars = idx.get_document_stats()
         logger.info(f"SearchService initialized with {doc_count} texts, total size: {total_chars:,} characters")
 
     # ­­­­­­­­­­­­­­­­­­­­­­­­­­­­­­­­­­­­­­­­­­­­­­­­­­­ #
-    def search(self, query: str) -> List[SearchHit]:
+    def search(self, query: str, regex: bool = False) -> List[SearchHit]:
+        """Return all hits for query; with regex=True it is a regular expression.
+
+        The returned list may be shared with other callers; don't modify it.
+        """
+        key = (query, regex)
+        with self._recent_lock:
+            hits = self._recent.get(key)
+            if hits is not None:
+                self._recent.move_to_end(key)
+                return hits
+
         start_time = time.perf_counter()
         idx = self._index_mgr.get()
         
         # Log search parameters
-        logger.info(f"Starting search for query: '{query}'")
+        logger.debug("Starting search for query: '%s'", query)
 
-        hits_data = idx.search_hits(query)
+        hits_data = idx.search_hits(query, regex=regex)
         hits = [SearchHit(episode_idx, char_offset) for episode_idx, char_offset in hits_data]
                     
         total_time = time.perf_counter() - start_time
-        logger.info(f"Search completed in {total_time*1000:.2f}ms. "
-                   f"Found {len(hits)} hits")
+        logger.info("Search completed in %.2fms. Found %d hits", total_time * 1000, len(hits))
+
+        if len(hits) <= self.RECENT_MAX_HITS:
+            with self._recent_lock:
+                old = self._recent.pop(key, None)
+                if old is not None:
+                    self._recent_hits -= len(old)
+                self._recent[key] = hits
+                self._recent_hits += len(hits)
+                while (len(self._recent) > self.RECENT_SEARCHES
+                       or self._recent_hits > self.RECENT_MAX_HITS):
+                    _, evicted = self._recent.popitem(last=False)
+                    self._recent_hits -= len(evicted)
         return hits
 
     def segment(self, hit: SearchHit) -> Segment:
         """Return the segment that contains this hit."""
         idx = self._index_mgr.get()
         return segment_for_hit(idx, hit.episode_idx, hit.char_offset)
+
+    def segments_batch(self, hits: Iterable[SearchHit]) -> Iterator[Segment]:
+        """Yield the segment of each hit, in order; cheaper than segment() per hit."""
+        idx = self._index_mgr.get()
+        return segments_for_hits(idx, ((hit.episode_idx, hit.char_offset) for hit in hits))
@@ -97,6 +97,42 @@ function loadAudio(placeholder) {
     return audio;
 }
 
+/* Source-group expand / collapse (header onclick in results.html) */
+function toggleSource(sourceId) {
+    const resultsDiv  = document.getElementById(sourceId + '-results');
+    const icon        = document.getElementById('icon-' + sourceId);
+    const sourceHeader= document.querySelector(`.source-header[onclick*="${sourceId}"]`);
+
+    if (resultsDiv.style.display === 'none') {
+        resultsDiv.style.display = 'block';
+        icon.textContent = '▼';
+
+        /* lazily load audio player */
+        const ph = sourceHeader.querySelector('.audio-container');
+        if (ph && ph.classList.contains('audio-container')) {
+            loadAudio(ph);
+        }
+
+        /* ensure header is visible */
+        if (!isInViewport(sourceHeader)) {
+            sourceHeader.scrollIntoView({behavior:'smooth', block:'start'});
+        }
+    } else {
+        resultsDiv.style.display = 'none';
+        icon.textContent = '▶';
+    }
+}
+
+function isInViewport(el) {
+    const r = el.getBoundingClientRect();
+    return (
+        r.top    >= 0 &&
+        r.left   >= 0 &&
+        r.bottom <= (window.innerHeight || document.documentElement.clientHeight) &&
+        r.right  <= (window.innerWidth  || document.documentElement.clientWidth)
+    );
+}
+
 /* ========================
    3 ‑ Segment fetch helpers
    ======================== */
@@ -194,17 +230,22 @@ async function fetchSegmentsByIdxBatch(lookups) {
    4 ‑ Text highlighting utils
    ======================== */
 const queryTerm = new URLSearchParams(window.location.search).get('q') || '';
+const HTML_ESCAPES = { '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' };
+function escapeHtml(txt) {
+    return String(txt).replace(/[&<>"']/g, c => HTML_ESCAPES[c]);
+}
+
 function highlightQuery(txt, charOffset) {
-    if (!queryTerm || charOffset === undefined) return txt;
+    if (!queryTerm || charOffset === undefined) return escapeHtml(txt);
     const escaped = queryTerm.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
     const regex = new RegExp(`(${escaped})`, 'i');
     const match = txt.slice(charOffset).match(regex);
-    if (!match) return txt;
+    if (!match) return escapeHtml(txt);
     
     const matchLength = match[0].length;
-    return txt.slice(0, charOffset) + 
-           `<strong>${txt.slice(charOffset, charOffset + matchLength)}</strong>` + 
-           txt.slice(charOffset + matchLength);
+    return escapeHtml(txt.slice(0, charOffset)) + 
+           `<strong>${escapeHtml(txt.slice(charOffset, charOffset + matchLength))}</strong>` + 
+           escapeHtml(txt.slice(charOffset + matchLength));
 }
 
 /* ========================
@@ -238,7 +279,7 @@ function buildContext(resultItem, seg, segmentMap) {
         return segments.map(s => {
             // Only highlight the exact match in the current segment
             const shouldHighlight = s.segment_index === curIdx;
-            const text = shouldHighlight ? highlightQuery(s.text, charOffset) : s.text;
+            const text = shouldHighlight ? highlightQuery(s.text, charOffset) : escapeHtml(s.text);
             return `
                 <div class="context-segment ${s.segment_index === curIdx ? 'current-segment' : ''}"
                      data-start="${s.start_sec}" 
@@ -1,7 +1,9 @@
 import os
 from urllib.parse import unquote
-from typing import Optional, List
-from flask import current_app
+from typing import Iterator, Optional, List
+from flask import current_app, request
+from werkzeug.security import safe_join
+from . import _TRUTHY
 from pathlib import Path
 from dataclasses import dataclass
 from typing import NamedTuple
@@ -18,8 +20,25 @@ class FileRecord(NamedTuple):
 
     def read_json(self) -> dict | list:
         """Read and parse the gzipped JSON file."""
-        with gzip.open(self.json_path, 'rb') as fh:
-            return orjson.loads(fh.read())
+        # One read of the compressed file and one C-level inflate, rather than
+        # GzipFile's chunked reads through Python
+        return orjson.loads(gzip.decompress(Path(self.json_path).read_bytes()))
+
+
+def _scan_json_files(root: Path) -> Iterator[Path]:
+    """Recursively yield transcript files under root.
+
+    Uses os.scandir so file/dir type comes from the directory entry itself
+    instead of one stat() per path as with Path.rglob.
+    """
+    stack = [os.fspath(root)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(_JSON_FILENAME) and entry.is_file():
+                    yield Path(entry.path)
 
 
 def get_transcripts(root: Path) -> List[FileRecord]:
@@ -35,7 +54,7 @@ def get_transcripts(root: Path) -> List[FileRecord]:
     and new nested files:            <source>/<id>/full_transcript.json.gz
     """
     recs: list[FileRecord] = []
-    for p in root.rglob(f"*{_JSON_FILENAME}"):
+    for p in _scan_json_files(root):
         rec_id = f"{p.parent.parent.name}/{p.parent.name}"
         recs.append(FileRecord(rec_id, p))
 
@@ -53,6 +72,29 @@ def get_transcripts(root: Path) -> List[FileRecord]:
     return recs
 
 
+def json_response(obj, status: int = 200):
+    """Build a JSON response serialized with orjson.
+
+    Faster than flask.jsonify for large result lists, and serializes
+    dataclasses (e.g. SearchHit) natively.
+    """
+    return current_app.response_class(orjson.dumps(obj), status=status, mimetype='application/json')
+
+
+def request_json():
+    """Parse the request body with orjson.
+
+    Flask 2.0 has no pluggable JSON provider, so request.json always goes
+    through the stdlib decoder. Raises ValueError on a malformed body.
+    """
+    return orjson.loads(request.get_data(cache=False))
+
+
+def request_flag(name: str) -> bool:
+    """Whether query argument `name` is set to a truthy value (1/true/yes/on)."""
+    return request.args.get(name, '').lower() in _TRUTHY
+
+
 def resolve_audio_path(source: str) -> Optional[str]:
     """
     Resolve the path to an audio file based on source.
@@ -72,9 +114,9 @@ def resolve_audio_path(source: str) -> Optional[str]:
 
     # Construct the direct path to the audio file based on source
     # Assuming the audio files are stored as: audio_dir/source/source.opus
-
-    source = source.split('/')
-    audio_path = os.path.join(audio_dir, *source)
+    # safe_join rejects '..' and absolute segments, so the path stays under
+    # audio_dir; it is handed to X-Sendfile / X-Accel-Redirect as-is
+    audio_path = safe_join(audio_dir, source)
     
     # Return the path if file exists, None otherwise
-    return audio_path if os.path.exists(audio_path) else None 
\ No newline at end of file
+    return audio_path if audio_path and os.path.exists(audio_path) else None 
\ No newline at end of file
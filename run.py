@@ -17,8 +17,6 @@ from pathlib import Path
 
 from app import create_app
 from app.utils import get_transcripts
-from app.services.index import IndexManager
-from app.services.search import SearchService
 
 # ---------------------------------------------------------------------------
 # 1. CLI parsing
@@ -86,12 +84,6 @@ def init_file_service(json_dir: Path, audio_dir: Path):
     log.info(f"Found {len(file_records)} transcript files")
     return file_records
 
-@timeit("Index build")
-def build_index(file_records, force: bool, index_file: str | None = None):
-    if force:
-        log.info("--force-reindex supplied; building fresh index …")
-    return IndexManager(file_records, index_file=index_file)
-
 # ---------------------------------------------------------------------------
 # 5. Wire everything up
 # ---------------------------------------------------------------------------
@@ -107,7 +99,6 @@ if not json_dir.is_dir():
 app = init_app(str(data_root))
 with app.app_context():
     file_records = init_file_service(json_dir, audio_dir)
-    print(file_records)
     from app import init_index_manager
     index_manager = init_index_manager(
         app,
@@ -119,12 +110,6 @@ with app.app_context():
     # expose to blueprints
     app.config["FILE_RECORDS"] = file_records
 
-    # make main blueprint globals match
-    from app.routes import main as main_bp
-    main_bp.file_records = file_records
-    main_bp.search_service = app.config["SEARCH_SERVICE"]
-    
-
     # memory diagnostics (optional)
     try:
         import psutil